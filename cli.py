@@ -3,22 +3,20 @@ import argparse
 import logging
 from pathlib import Path
 from datetime import datetime
-from db import initialize_database
+from db import initialize_database, connection, transaction
 from sample_data import create_sample_data
 from reports import build_tree, export_json, export_html
 
-logging.basicConfig(
-    filename="system.log",
-    level=logging.DEBUG,
-    format="%(asctime)s [%(levelname)s] %(message)s"
-)
-
 def main():
     parser = argparse.ArgumentParser(description="Versioned DAG Ticket System")
+    parser.add_argument("--debug", action="store_true",
+                        help="Write DEBUG level messages to system.log")
     sub = parser.add_subparsers(dest="command")
 
     sub.add_parser("init")
-    sub.add_parser("sample")
+    sample = sub.add_parser("sample")
+    sample.add_argument("--force", action="store_true",
+                        help="Re-insert even if the sample data is already present")
 
     report = sub.add_parser("report")
     report.add_argument("--current-root", "-c", dest="current_root", required=True,
@@ -29,35 +27,46 @@ def main():
 
     args = parser.parse_args()
 
+    logging.basicConfig(
+        filename="system.log",
+        level=logging.DEBUG if args.debug else logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(message)s"
+    )
+
     if args.command == "init":
         initialize_database()
         logging.info("Database initialized")
 
     elif args.command == "sample":
-        create_sample_data()
-        logging.info("Sample data inserted")
+        if create_sample_data(force=args.force):
+            logging.info("Sample data inserted or updated")
+        else:
+            logging.info("Sample data already present, nothing inserted")
 
     elif args.command == "report":
         logging.info("Generating report for current_root=%s predecessor_root=%s format=%s",
                      args.current_root, args.predecessor_root, args.format)
-        tree = build_tree(args.current_root, predecessor_root=args.predecessor_root)
+        # one connection and one read snapshot serve both the tree build and
+        # the HTML export
+        with connection() as conn, transaction(conn):
+            tree = build_tree(args.current_root, predecessor_root=args.predecessor_root, conn=conn)
 
-        reports_dir = Path("reports")
-        reports_dir.mkdir(parents=True, exist_ok=True)
-        timestamp = datetime.now().strftime("%Y-%m-%d-%H%M")
-        base = f"bug-report_{args.current_root}"
-        if args.predecessor_root:
-            base += f"_{args.predecessor_root}"
-        base = base + f"_{timestamp}"
+            reports_dir = Path("reports")
+            reports_dir.mkdir(parents=True, exist_ok=True)
+            timestamp = datetime.now().strftime("%Y-%m-%d-%H%M")
+            base = f"bug-report_{args.current_root}"
+            if args.predecessor_root:
+                base += f"_{args.predecessor_root}"
+            base = base + f"_{timestamp}"
 
-        if args.format in ("json", "both"):
-            json_path = reports_dir / f"{base}.json"
-            export_json(tree, str(json_path))
-            logging.info("Wrote JSON report: %s", json_path)
-        if args.format in ("html", "both"):
-            html_path = reports_dir / f"{base}.html"
-            export_html(tree, str(html_path), "Bug-Report")
-            logging.info("Wrote HTML report: %s", html_path)
+            if args.format in ("json", "both"):
+                json_path = reports_dir / f"{base}.json"
+                export_json(tree, str(json_path))
+                logging.info("Wrote JSON report: %s", json_path)
+            if args.format in ("html", "both"):
+                html_path = reports_dir / f"{base}.html"
+                export_html(tree, str(html_path), "Bug-Report", conn=conn)
+                logging.info("Wrote HTML report: %s", html_path)
 
         logging.info("Report generated for current_root %s", args.current_root)
 
@@ -1,17 +1,54 @@
 
 import sqlite3
+from contextlib import closing, contextmanager, nullcontext
 from pathlib import Path
 
 DB_PATH = Path("graph_system.db")
 
-def get_connection():
-    conn = sqlite3.connect(DB_PATH)
+def tune(conn):
+    """Apply the performance PRAGMAs used by every connection."""
+    # Reporting issues many small reads; WAL, a larger page cache, in-memory
+    # temp storage and mmap I/O cut per-statement overhead.
+    conn.execute("PRAGMA journal_mode = WAL;")
+    conn.execute("PRAGMA synchronous = NORMAL;")
+    conn.execute("PRAGMA cache_size = -65536;")
+    conn.execute("PRAGMA temp_store = MEMORY;")
+    conn.execute("PRAGMA mmap_size = 268435456;")
+    return conn
+
+def get_connection(path=None):
+    """Open DB_PATH, or path if given (":memory:" for a throwaway database)."""
+    conn = sqlite3.connect(DB_PATH if path is None else path, cached_statements=256)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON;")
-    return conn
+    return tune(conn)
+
+def connection(conn=None):
+    """Context manager yielding conn, or a fresh connection closed on exit."""
+    return nullcontext(conn) if conn is not None else closing(get_connection())
 
-def initialize_database():
-    conn = get_connection()
+@contextmanager
+def transaction(conn):
+    """Run the block in one transaction, committed on success and rolled back
+    on error. For reads this gives every query the same snapshot without
+    taking the shared lock per statement. A transaction the caller already
+    has open is left alone: neither committed nor rolled back here."""
+    if conn.in_transaction:
+        yield
+        return
+    conn.execute("BEGIN")
+    try:
+        yield
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+def initialize_database(conn=None):
+    with connection(conn) as conn:
+        _initialize_database(conn)
+
+def _initialize_database(conn):
     cur = conn.cursor()
 
     cur.executescript("""
@@ -68,7 +105,9 @@ def initialize_database():
         FOREIGN KEY (ticket_id) REFERENCES tickets(id),
         FOREIGN KEY (version_id) REFERENCES element_versions(id)
     );
+
+    CREATE INDEX IF NOT EXISTS idx_tv_version ON ticket_versions(version_id);
+    CREATE INDEX IF NOT EXISTS idx_fn_bug ON fix_neutralises(bug_id);
     """)
 
     conn.commit()
-    conn.close()
@@ -1,5 +1,8 @@
+from db import connection, transaction
 from reports import build_tree, export_html
 
-t = build_tree('APP_v2', predecessor_root='APP_v1')
-export_html(t, 'reports/debug_test.html', 'Bug-Report')
-print('wrote debug_test.html')
+if __name__ == '__main__':
+    with connection() as conn, transaction(conn):
+        t = build_tree('APP_v2', predecessor_root='APP_v1', conn=conn)
+        export_html(t, 'reports/debug_test.html', 'Bug-Report', conn=conn)
+    print('wrote debug_test.html')
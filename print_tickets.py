@@ -1,6 +1,11 @@
+import sys
 from db import get_connection
 
 conn = get_connection()
-for r in conn.execute("SELECT id,title,description FROM tickets ORDER BY id"):
-    print(f"{r['id']}|{r['title']}|{r['description']}")
+conn.row_factory = None
+cur = conn.execute("SELECT id,title,description FROM tickets ORDER BY id")
+out = sys.stdout.write
+while rows := cur.fetchmany(4096):
+    out("\n".join(f"{r[0]}|{r[1]}|{r[2]}" for r in rows))
+    out("\n")
 conn.close()
@@ -1,180 +1,341 @@
 
 import json
-from collections import defaultdict
+from collections import defaultdict, deque
 from pathlib import Path
-from db import get_connection
+from db import connection, transaction
 import logging
 
+try:
+    import orjson
+except ImportError:  # optional, falls back to the stdlib encoder
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
-def history_closure(conn, version_id):
-    sql = """
-    WITH RECURSIVE history(id) AS (
-        SELECT ?
-        UNION
-        SELECT predecessor_id
-        FROM element_version_predecessors
-        JOIN history ON version_id = history.id
-    )
-    SELECT id FROM history;
+# SQL statements are module-level constants so their text is identical on
+# every call and sqlite3's per-connection statement cache always hits.
+_SQL_PREDECESSOR_EDGES = "SELECT version_id, predecessor_id FROM element_version_predecessors"
+
+# ordered so each parent's children come out in the same order the old
+# recursive containment CTE produced them (primary key order)
+_SQL_DEPENDENCY_EDGES = """
+    SELECT parent_version_id, child_version_id
+    FROM element_version_dependencies
+    ORDER BY parent_version_id, child_version_id
+"""
+
+_SQL_VERSION_ELEMENTS = "SELECT id, element_id, version, variant FROM element_versions"
+
+# explicit rowid order: positions in this result order the active bug
+# lists, so they must not depend on which index the planner picks
+_SQL_TICKETS = """
+    SELECT t.id, t.type, tv.version_id, t.title, t.description
+    FROM tickets t
+    JOIN ticket_versions tv ON t.id = tv.ticket_id
+    ORDER BY tv.rowid
+"""
+
+_SQL_NEUTRALISES = "SELECT fix_id, bug_id FROM fix_neutralises ORDER BY fix_id, bug_id"
+
+_SQL_DISPLAY_NAMES = """
+    SELECT ev.id, ev.version, ev.variant, e.name
+    FROM element_versions ev
+    JOIN elements e ON ev.element_id = e.id
+    JOIN _display_ids d ON d.id = ev.id
+"""
+
+_SQL_STAGED_TICKETS = """
+    SELECT t.id, t.title, t.description
+    FROM tickets t
+    JOIN _ticket_ids s ON s.id = t.id
+"""
+
+# ticket_versions rows for the versions staged in _report_versions, in table order
+_SQL_TICKET_VERSIONS = """
+    SELECT tv.ticket_id, tv.version_id
+    FROM ticket_versions tv
+    JOIN _report_versions r ON r.id = tv.version_id
+    ORDER BY tv.rowid
+"""
+
+# Single-pass HTML escaping for text interpolated into the report
+_HTML_ESC = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#x27;"})
+
+def esc(s):
+    return s.translate(_HTML_ESC) if s else ""
+
+def _tuple_cursor(conn):
+    """Cursor yielding plain tuples instead of sqlite3.Row, which skips the
+    per-column name lookups."""
+    cur = conn.cursor()
+    cur.row_factory = None
+    return cur
+
+def load_graphs(conn):
+    """Load both version DAGs once as adjacency dicts.
+
+    Returns (pred_adj, child_adj): version_id -> [predecessor_id] for the
+    history DAG and parent_version_id -> [child_version_id] for the
+    containment DAG. Closures are then walked in memory instead of running a
+    recursive CTE per call.
     """
-    rows = [r["id"] for r in conn.execute(sql, (version_id,))]
-    logger.debug("history_closure: start=%s count=%d nodes=%s", version_id, len(rows), rows)
-    return set(rows)
-
-def active_bugs(conn, version_id):
-    history = history_closure(conn, version_id)
-    introduced = {}
-    fixes = set()
-
-    for row in conn.execute("""
-        SELECT t.id, t.type, tv.version_id, t.title, t.description
-        FROM tickets t
-        JOIN ticket_versions tv ON t.id = tv.ticket_id
-    """):
-        if row["version_id"] in history:
-            if row["type"] == "bug":
-                introduced[row["id"]] = {
-                    "id": row["id"],
-                    "title": row["title"],
-                    "description": row["description"]
-                }
-                logger.debug("active_bugs: version=%s introduced_bug=%s", version_id, row["id"])
-            elif row["type"] == "bugfix":
-                fix_id = row["id"]
-                # read neutralisations from fix_neutralises table
-                nrows = [r["bug_id"] for r in conn.execute("SELECT bug_id FROM fix_neutralises WHERE fix_id = ?", (fix_id,))]
-                for nid in nrows:
-                    fixes.add(nid)
-                    logger.debug("active_bugs: version=%s bugfix=%s neutralises=%s", version_id, fix_id, nid)
-
-    neutralised = [i for i in introduced.keys() if i in fixes]
-    if neutralised:
-        logger.info("active_bugs: version=%s neutralised_bugs=%s", version_id, neutralised)
-
-    active = [b for i, b in introduced.items() if i not in fixes]
-    logger.debug("active_bugs: version=%s active_count=%d active_ids=%s", version_id, len(active), [b["id"] for b in active])
-    return active
-
-def containment_tree(conn, root):
-    sql = """
-    WITH RECURSIVE deps(id, parent) AS (
-        SELECT ?, NULL
-        UNION
-        SELECT d.child_version_id, d.parent_version_id
-        FROM element_version_dependencies d
-        JOIN deps ON d.parent_version_id = deps.id
-    )
-    SELECT id, parent FROM deps;
+    cur = _tuple_cursor(conn)
+    pred_adj = defaultdict(list)
+    for version_id, predecessor_id in cur.execute(_SQL_PREDECESSOR_EDGES):
+        pred_adj[version_id].append(predecessor_id)
+    child_adj = defaultdict(list)
+    for parent_id, child_id in cur.execute(_SQL_DEPENDENCY_EDGES):
+        child_adj[parent_id].append(child_id)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("load_graphs: predecessor_edges=%d dependency_edges=%d",
+                     sum(len(p) for p in pred_adj.values()), sum(len(c) for c in child_adj.values()))
+    return pred_adj, child_adj
+
+def load_element_versions(conn):
+    """Return version_id -> (element_id, version, variant) for every element version."""
+    cur = _tuple_cursor(conn)
+    return {vid: (eid, ver, var) for vid, eid, ver, var in cur.execute(_SQL_VERSION_ELEMENTS)}
+
+def history_closure(pred_adj, version_id, cache=None):
+    """Return the set of versions in the history of version_id (itself included).
+
+    cache maps version_id -> already computed closure; an ancestor found there
+    contributes its whole closure without being walked again.
     """
-    nodes = list(conn.execute(sql, (root,)))
-    logger.debug("containment_tree: root=%s nodes_found=%d", root, len(nodes))
-    children = defaultdict(list)
-    for n in nodes:
-        if n["parent"]:
-            children[n["parent"]].append(n["id"])
-    return children
-
-
-def containment_nodes(conn, root):
-    sql = """
-    WITH RECURSIVE deps(id, parent) AS (
-        SELECT ?, NULL
-        UNION
-        SELECT d.child_version_id, d.parent_version_id
-        FROM element_version_dependencies d
-        JOIN deps ON d.parent_version_id = deps.id
-    )
-    SELECT id FROM deps;
+    if cache is None:
+        cache = {}
+    elif version_id in cache:
+        return set(cache[version_id])
+    seen = {version_id}
+    stack = [version_id]
+    while stack:
+        for p in pred_adj.get(stack.pop(), ()):
+            if p in seen:
+                continue
+            # a cached closure is closed under predecessors: take it whole
+            # and stop expanding this branch
+            hit = cache.get(p)
+            if hit is not None:
+                seen |= hit
+            else:
+                seen.add(p)
+                stack.append(p)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("history_closure: start=%s count=%d", version_id, len(seen))
+    return seen
+
+def load_tickets(conn):
+    """Load ticket assignments once for the whole report.
+
+    Returns (tickets_by_version, neutralises_by_fix): (pos, id, type, title,
+    description) tuples bucketed by the version they are attached to, where pos
+    is the row's position in the join so callers can restore query order, and
+    fix_id -> [bug_id].
     """
-    return {r["id"] for r in conn.execute(sql, (root,))}
-
-
-def get_element_info(conn, version_id):
-    row = conn.execute("SELECT element_id, version FROM element_versions WHERE id = ?", (version_id,)).fetchone()
-    if row:
-        return row["element_id"], row["version"]
-    return None, None
-
-
-def get_element_display_name(conn, version_id):
-    """Get formatted display: Name Version - Variant (Id: version_id)."""
-    row = conn.execute("""
-        SELECT ev.id, ev.version, ev.variant, e.name
-        FROM element_versions ev
-        JOIN elements e ON ev.element_id = e.id
-        WHERE ev.id = ?
-    """, (version_id,)).fetchone()
-    if row:
-        return f"{row['name']} {row['version']} - {row['variant']} (Id: {row['id']})"
-    return version_id
+    cur = _tuple_cursor(conn)
+    tickets_by_version = defaultdict(list)
+    for pos, (tid, ttype, vid, title, desc) in enumerate(cur.execute(_SQL_TICKETS)):
+        tickets_by_version[vid].append((pos, tid, ttype, title, desc))
+
+    neutralises_by_fix = defaultdict(list)
+    for fix_id, bug_id in cur.execute(_SQL_NEUTRALISES):
+        neutralises_by_fix[fix_id].append(bug_id)
+    return tickets_by_version, neutralises_by_fix
+
+def index_tickets(tickets_by_version, neutralises_by_fix):
+    """Derive per-version bug sets from load_tickets output.
+
+    Returns (bugs_introduced_at, bugs_fixed_at, bug_meta): version_id ->
+    {bug_id: pos} for bugs attached there, version_id -> set of bug ids
+    neutralised by fixes attached there, and bug_id -> {id, title, description}.
+    """
+    bugs_introduced_at = defaultdict(dict)
+    bugs_fixed_at = defaultdict(set)
+    bug_meta = {}
+    for vid, rows in tickets_by_version.items():
+        for pos, tid, ttype, title, desc in rows:
+            if ttype == "bug":
+                bugs_introduced_at[vid].setdefault(tid, pos)
+                bug_meta[tid] = {"id": tid, "title": title, "description": desc}
+            elif ttype == "bugfix":
+                bugs_fixed_at[vid].update(neutralises_by_fix.get(tid, ()))
+    return bugs_introduced_at, bugs_fixed_at, bug_meta
+
+def active_bugs(version_id, history, bugs_introduced_at, bugs_fixed_at, bug_meta):
+    # intersect in C rather than probing every history entry in Python
+    introduced = [bugs_introduced_at[v] for v in history & bugs_introduced_at.keys()]
+    if not introduced:
+        return []
+    fixes = set().union(*(bugs_fixed_at[v] for v in history & bugs_fixed_at.keys()))
+
+    # bug_id -> first position in the ticket join, used to keep a stable order
+    first_pos = {}
+    for at in introduced:
+        for bid, pos in at.items():
+            if bid not in first_pos or pos < first_pos[bid]:
+                first_pos[bid] = pos
+
+    if logger.isEnabledFor(logging.INFO):
+        neutralised = first_pos.keys() & fixes
+        if neutralised:
+            logger.info("active_bugs: version=%s neutralised_bugs=%s", version_id, sorted(neutralised))
+
+    active = [bug_meta[bid] for bid in sorted(first_pos.keys() - fixes, key=first_pos.__getitem__)]
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("active_bugs: version=%s active_count=%d active_ids=%s", version_id, len(active), [b["id"] for b in active])
+    return active
 
-def build_tree(current_root, predecessor_root=None):
-    conn = get_connection()
-    children = containment_tree(conn, current_root)
+def containment(child_adj, root):
+    """Walk the containment DAG below root.
 
-    predecessor_nodes = None
+    Returns (children, nodes): parent -> [child] for every version below root
+    that has children, and the set of all versions reached (root included).
+    """
+    reached = {}
+    queue = deque([root])
+    while queue:
+        node = queue.popleft()
+        if node in reached:
+            continue
+        kids = reached[node] = child_adj.get(node, [])
+        queue.extend(kids)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("containment: root=%s nodes_found=%d", root, len(reached))
+    return {parent: kids for parent, kids in reached.items() if kids}, reached.keys()
+
+
+def _format_display_name(row):
+    vid, version, variant, name = row
+    return f"{name} {version} - {variant} (Id: {vid})"
+
+
+def _stage_ids(conn, table, ids):
+    """Load ids into a temp table so queries can join against it with fixed
+    statement text (cached plan, no bound-parameter limit)."""
+    conn.execute(f"CREATE TEMP TABLE IF NOT EXISTS {table}(id TEXT PRIMARY KEY)")
+    conn.execute(f"DELETE FROM {table}")
+    conn.executemany(f"INSERT OR IGNORE INTO {table} VALUES (?)", [(i,) for i in ids])
+
+
+def get_element_display_names(conn, version_ids):
+    """Returns {version_id: "Name Version - Variant (Id: version_id)"}; ids
+    without a row map to themselves."""
+    names = {vid: vid for vid in version_ids}
+    _stage_ids(conn, "_display_ids", names)
+    cur = _tuple_cursor(conn)
+    for row in cur.execute(_SQL_DISPLAY_NAMES):
+        names[row[0]] = _format_display_name(row)
+    return names
+
+def build_tree(current_root, predecessor_root=None, conn=None):
+    """Build the report tree. Pass conn to reuse an open connection; otherwise
+    one is opened and closed here."""
+    with connection(conn) as conn, transaction(conn):
+        return _build_tree(conn, current_root, predecessor_root)
+
+def _build_tree(conn, current_root, predecessor_root):
+    # Histories and containment closures are needed for many versions; load
+    # both DAGs once and walk them in memory, memoizing each version's ancestry.
+    pred_adj, child_adj = load_graphs(conn)
+    children, _ = containment(child_adj, current_root)
+    element_versions = load_element_versions(conn)
+    hist_cache = {}
+
+    def history(version_id):
+        # the cached set is shared by every caller and must not be mutated
+        hist = hist_cache.get(version_id)
+        if hist is None:
+            hist = hist_cache[version_id] = history_closure(pred_adj, version_id, hist_cache)
+        return hist
+
+    tickets_by_version, neutralises_by_fix = load_tickets(conn)
+    bugs_introduced_at, bugs_fixed_at, bug_meta = index_tickets(tickets_by_version, neutralises_by_fix)
+
+    # Active bugs of a version are needed for its own entry and again for
+    # every subtree aggregation that contains it; compute them once.
+    active_cache = {}
+
+    def active(version_id):
+        bugs = active_cache.get(version_id)
+        if bugs is None:
+            bugs = active_cache[version_id] = active_bugs(
+                version_id, history(version_id), bugs_introduced_at, bugs_fixed_at, bug_meta)
+        return bugs
+
+    # Ids of the active bugs anywhere in a version's containment subtree; the
+    # interval of every node compares two of these, and subtrees overlap.
+    subtree_bug_cache = {}
+
+    def subtree_bugs(root):
+        in_progress = set()
+        stack = [(root, False)]
+        while stack:
+            v, expanded = stack.pop()
+            if v in subtree_bug_cache:
+                continue
+            kids = child_adj.get(v, ())
+            if expanded:
+                in_progress.discard(v)
+                bugs = {b["id"] for b in active(v)}
+                for c in kids:
+                    bugs |= subtree_bug_cache[c]
+                subtree_bug_cache[v] = bugs
+                continue
+            if v in in_progress:
+                raise ValueError(f"Containment cycle detected at {v}")
+            in_progress.add(v)
+            stack.append((v, True))
+            stack.extend((c, False) for c in kids if c not in subtree_bug_cache)
+        return subtree_bug_cache[root]
+
+    # element_id -> (version_id, (version, variant)) of the highest version of
+    # that element in the predecessor DAG; ties on version go to the highest
+    # variant, as the (element_id, version, variant) index orders them
+    pred_by_element = {}
     if predecessor_root:
-        predecessor_nodes = containment_nodes(conn, predecessor_root)
+        _, predecessor_nodes = containment(child_adj, predecessor_root)
         logger.info("build_tree: current_root=%s predecessor_root=%s predecessor_nodes=%d", current_root, predecessor_root, len(predecessor_nodes))
+        for pid in predecessor_nodes:
+            info = element_versions.get(pid)
+            if info is None:
+                continue
+            eid, ver, var = info
+            best = pred_by_element.get(eid)
+            if best is None or (ver, var) > best[1]:
+                pred_by_element[eid] = (pid, (ver, var))
 
     def compute_interval_for_element(node):
-        element_id, _ = get_element_info(conn, node)
-        pred_version = None
-        if predecessor_nodes and element_id:
-            preds = list(predecessor_nodes)
-            placeholders = ",".join("?" for _ in preds)
-            sql = f"SELECT id, version FROM element_versions WHERE element_id = ? AND id IN ({placeholders}) ORDER BY version DESC LIMIT 1"
-            params = [element_id] + preds
-            row = conn.execute(sql, params).fetchone()
-            if row:
-                pred_version = row["id"]
+        info = element_versions.get(node)
+        best = pred_by_element.get(info[0]) if info else None
+        pred_version = best[0] if best else None
 
         introduced = []
         fixes = []
         # Only compute interval changes if we found a predecessor version for this element
         if pred_version:
-            node_hist = history_closure(conn, node)
-            pred_hist = history_closure(conn, pred_version)
+            node_hist = history(node)
+            pred_hist = history(pred_version)
             interval_nodes = node_hist - pred_hist
-            if interval_nodes:
-                preds = list(interval_nodes)
-                placeholders = ",".join("?" for _ in preds)
-                sql = f"SELECT t.id, t.type, tv.version_id, t.title, t.description FROM tickets t JOIN ticket_versions tv ON t.id = tv.ticket_id WHERE tv.version_id IN ({placeholders})"
-                for row in conn.execute(sql, preds):
-                    if row["type"] == "bug":
-                        introduced.append({"id": row["id"], "title": row["title"], "description": row["description"]})
-                    elif row["type"] == "bugfix":
-                        # gather neutralises list from fix_neutralises table (fallback to legacy column)
-                        fix_id = row["id"]
-                        nrows = [r["bug_id"] for r in conn.execute("SELECT bug_id FROM fix_neutralises WHERE fix_id = ?", (fix_id,))]
-                        neutralises = nrows
-                        fixes.append({"id": row["id"], "title": row["title"], "description": row["description"], "neutralises": neutralises})
+            # tickets attached inside the interval, in ticket join order
+            interval_tickets = sorted(
+                row for vid in interval_nodes & tickets_by_version.keys() for row in tickets_by_version[vid])
+            for _, tid, ttype, title, desc in interval_tickets:
+                if ttype == "bug":
+                    introduced.append({"id": tid, "title": title, "description": desc})
+                elif ttype == "bugfix":
+                    # neutralises list comes from the preloaded fix_neutralises map
+                    neutralises = list(neutralises_by_fix.get(tid, ()))
+                    fixes.append({"id": tid, "title": title, "description": desc, "neutralises": neutralises})
 
             # Additionally infer implicit fixes by comparing aggregated bugs in subtree
-            # Compute aggregated active bugs for current node subtree and predecessor subtree
-            curr_nodes = containment_nodes(conn, node)
-            pred_nodes = containment_nodes(conn, pred_version) if pred_version else set()
-
-            def agg_bugs_for_nodes(nodeset):
-                agg = set()
-                for vid in nodeset:
-                    # collect active bugs (direct) for each version in the containment subtree
-                    for b in active_bugs(conn, vid):
-                        agg.add(b["id"])
-                return agg
-
-            curr_agg = agg_bugs_for_nodes(curr_nodes)
-            pred_agg = agg_bugs_for_nodes(pred_nodes)
+            # Compare aggregated active bugs for current node subtree and predecessor subtree
+            curr_agg = subtree_bugs(node)
+            pred_agg = subtree_bugs(pred_version)
 
             # Bugs fixed are those present in predecessor subtree but not in current subtree
             implicit_fixed = sorted(pred_agg - curr_agg)
             # gather already-neutralised ids from explicit fixes
-            explicit_neuts = set()
-            for f in fixes:
-                for n in f.get("neutralises", []):
-                    if n:
-                        explicit_neuts.add(n)
+            explicit_neuts = {n for f in fixes for n in f["neutralises"] if n}
             for bid in implicit_fixed:
                 if bid in explicit_neuts:
                     continue
@@ -182,13 +343,21 @@ def build_tree(current_root, predecessor_root=None):
                 fixes.append({"id": synth_id, "title": "Implicit fix (dependency removal)", "description": "Implicitly fixed due to dependency removal", "neutralises": [bid]})
                 logger.info("compute_interval_for_element: node=%s implicitly_fixed=%s", node, bid)
 
-        logger.debug("compute_interval_for_element: node=%s pred_version=%s introduced=%d fixes=%d", node, pred_version, len(introduced), len(fixes))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("compute_interval_for_element: node=%s pred_version=%s introduced=%d fixes=%d", node, pred_version, len(introduced), len(fixes))
         return pred_version, {"introduced": introduced, "fixes": fixes}
 
+    # The containment graph is a DAG: a version reachable through several
+    # parents is built once and its entry shared. Nodes are visited in
+    # post-order with an explicit stack so deep graphs don't hit the
+    # recursion limit.
+    entries = {}
+
     def build(node):
-        logger.debug("build: entering node=%s children=%s", node, children.get(node, []))
-        bugs = active_bugs(conn, node)
-        subnodes = [build(c) for c in children.get(node, [])]
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("build: entering node=%s children=%s", node, children.get(node, []))
+        bugs = active(node)
+        subnodes = [entries[c] for c in children.get(node, [])]
         summary = {
             "elements": 1 + sum(s["summary"]["elements"] for s in subnodes),
             "bugs": len(bugs) + sum(s["summary"]["bugs"] for s in subnodes)
@@ -207,433 +376,424 @@ def build_tree(current_root, predecessor_root=None):
             node_entry["version_not_updated"] = (pred_ver == node)
         return node_entry
 
-    tree = build(current_root)
-    conn.close()
-    return tree
+    in_progress = set()
+    stack = [(current_root, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if node in entries:
+            continue
+        if expanded:
+            in_progress.discard(node)
+            entries[node] = build(node)
+            continue
+        if node in in_progress:
+            raise ValueError(f"Containment cycle detected at {node}")
+        in_progress.add(node)
+        stack.append((node, True))
+        stack.extend((c, False) for c in reversed(children.get(node, [])) if c not in entries)
+
+    return entries[current_root]
 
 def export_json(data, filename):
-    Path(filename).write_text(json.dumps(data, indent=2))
-
-def export_html(data, filename, title):
-    conn = get_connection()
+    if orjson is not None:
+        Path(filename).write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    else:
+        # raw UTF-8 like orjson, so the file is the same bytes either way
+        with open(filename, "w", encoding="utf-8", buffering=1 << 20) as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+def export_html(data, filename, title, conn=None):
+    with connection(conn) as conn, transaction(conn):
+        _export_html(conn, data, filename, title)
+
+def _export_html(conn, data, filename, title):
     all_versions = {}  # version_id -> node for collecting all versions
-    all_bugs = {}  # bug_id -> {"title", "description", "versions": [version_ids]}
-
-    def collect_all_versions(node):
-        """Traverse tree and collect all unique versions and bugs."""
-        version_id = node["version"]
-        if version_id not in all_versions:
+    all_bugs = {}  # bug_id -> {"title", "description", "versions": {version_ids}}
+
+    bug_by_id = {}  # bug_id -> active bug entry as found in the tree
+    agg_cache = {}  # version_id -> ids of the active bugs in its subtree; shared read-only by callers
+    fix_cache = {}  # version_id -> ids of the since_predecessor fixes in its subtree
+    changes_cache = {}  # version_id -> (introduced, fixes) since predecessor in its descendants
+    direct_bug_ids = {}  # version_id -> ids of its own active bugs
+    own_fix_ids = {}  # version_id -> ids of its own since_predecessor fixes
+
+    def collect_all_versions(root):
+        """Single pass over the tree: collect all unique versions and bugs, and
+        record in agg_cache the ids of the active bugs of each node and all its
+        descendants, in fix_cache the fix ids below it and
+        in changes_cache the introduced bugs and fixes of its descendants. The
+        node's own bug and fix ids are kept in direct_bug_ids / own_fix_ids.
+
+        Equal versions have equal subtrees, so each version is walked once.
+        Versions are registered in pre-order and aggregated in post-order
+        using an explicit stack.
+        """
+        stack = [(root, False)]
+        while stack:
+            node, expanded = stack.pop()
+            version_id = node["version"]
+            if expanded:
+                direct_bug_ids[version_id] = {bug["id"] for bug in node.get("active_bugs", [])}
+                aggregated = set(direct_bug_ids[version_id])
+                own_fix_ids[version_id] = {f["id"] for f in (node.get("since_predecessor") or {}).get("fixes", [])}
+                fix_ids = set(own_fix_ids[version_id])
+                introduced, fixes = {}, {}
+                # Fold in the children's results
+                for child in node.get("children", []):
+                    child_version = child["version"]
+                    aggregated |= agg_cache[child_version]
+                    fix_ids |= fix_cache[child_version]
+                    sp = child.get("since_predecessor") or {}
+                    for b in sp.get("introduced", []):
+                        introduced[b["id"]] = b
+                    for f in sp.get("fixes", []):
+                        fixes[f["id"]] = f
+                    child_introduced, child_fixes = changes_cache[child_version]
+                    introduced.update(child_introduced)
+                    fixes.update(child_fixes)
+                agg_cache[version_id] = aggregated
+                fix_cache[version_id] = fix_ids
+                changes_cache[version_id] = (introduced, fixes)
+                continue
+            if version_id in all_versions:
+                continue
             all_versions[version_id] = node
             # Collect active bugs from this version
             for bug in node.get("active_bugs", []):
+                bug_by_id.setdefault(bug["id"], bug)
                 if bug["id"] not in all_bugs:
-                    all_bugs[bug["id"]] = {"title": bug["title"], "description": bug.get("description", ""), "versions": []}
-                if version_id not in all_bugs[bug["id"]]["versions"]:
-                    all_bugs[bug["id"]]["versions"].append(version_id)
-        for child in node.get("children", []):
-            collect_all_versions(child)
-    
-    def collect_aggregated_bugs(node):
-        """Collect all active bugs from this node and all descendant nodes, deduped by bug_id."""
-        aggregated = {}
-        # Add bugs from this node
-        for bug in node.get("active_bugs", []):
-            if bug["id"] not in aggregated:
-                aggregated[bug["id"]] = bug
-        # Add bugs from children
-        for child in node.get("children", []):
-            child_bugs = collect_aggregated_bugs(child)
-            for bug_id, bug_info in child_bugs.items():
-                if bug_id not in aggregated:
-                    aggregated[bug_id] = bug_info
-        return aggregated
-    
+                    all_bugs[bug["id"]] = {"title": bug["title"], "description": bug.get("description", ""), "versions": set()}
+                all_bugs[bug["id"]]["versions"].add(version_id)
+            stack.append((node, True))
+            stack.extend((c, False) for c in reversed(node.get("children", [])))
+
     def find_bug_path(node, bug_id):
-        """Find the path from node down to where bug_id exists. Returns list of version_ids."""
-        # Check if bug is directly in this node
-        for bug in node.get("active_bugs", []):
-            if bug["id"] == bug_id:
-                return [node["version"]]
-        # Check children recursively
-        for child in node.get("children", []):
-            path = find_bug_path(child, bug_id)
-            if path:
-                return [node["version"]] + path
+        """Find the path from node down to where bug_id exists. Returns list of version_ids.
+
+        Descends into the first child whose aggregated bugs contain bug_id,
+        which is the path a depth-first search would find.
+        """
+        path = []
+        while node is not None:
+            path.append(node["version"])
+            if bug_id in direct_bug_ids[node["version"]]:
+                return path
+            node = next((c for c in node.get("children", []) if bug_id in agg_cache[c["version"]]), None)
         return None
 
     def find_fix_path(node, fix_id):
         """Find the path from node down to where fix_id exists (in since_predecessor.fix list)."""
-        sp = node.get("since_predecessor") or {}
-        for f in sp.get("fixes", []):
-            if f.get("id") == fix_id:
-                return [node["version"]]
-        for child in node.get("children", []):
-            path = find_fix_path(child, fix_id)
-            if path:
-                return [node["version"]] + path
+        path = []
+        while node is not None:
+            path.append(node["version"])
+            if fix_id in own_fix_ids[node["version"]]:
+                return path
+            node = next((c for c in node.get("children", []) if fix_id in fix_cache[c["version"]]), None)
         return None
 
-    def collect_changes_in_descendants(node):
-        """Collect introduced/fixes from all descendant nodes (not including node itself)."""
-        introduced = {}
-        fixes = {}
-        for child in node.get("children", []):
-            sp = child.get("since_predecessor") or {}
-            for b in sp.get("introduced", []):
-                introduced[b["id"]] = b
-            for f in sp.get("fixes", []):
-                fixes[f["id"]] = f
-            # recurse into grandchildren
-            child_changes = collect_changes_in_descendants(child)
-            for bid, binfo in child_changes.get("introduced", {}).items():
-                introduced[bid] = binfo
-            for fid, finfo in child_changes.get("fixes", {}).items():
-                fixes[fid] = finfo
-        return {"introduced": introduced, "fixes": fixes}
-
-    def render_bom(node):
+    def link(kind, ticket_id):
+        ticket_id = esc(ticket_id)
+        return f"<a href='#{kind}-{ticket_id}'>{ticket_id}</a>"
+
+    def render_bom(root, buf):
         """Render BOM (hierarchy only, no details)."""
-        version_id = node["version"]
-        display = get_element_display_name(conn, version_id)
-        # Hyperlink the element ID
-        display_with_link = display.replace(f"(Id: {version_id})", f"(Id: <a href='#{version_id}'>{version_id}</a>)")
-        html = f"<li>{display_with_link}"
-        if node["children"]:
-            html += "<ul>"
-            for c in node["children"]:
-                html += render_bom(c)
-            html += "</ul>"
-        html += "</li>"
-        return html
+        # closing tags are pushed as plain strings between the child nodes
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, str):
+                buf.append(node)
+                continue
+            buf.append(f"<li>{linked_display_cache[node['version']]}")
+            kids = node["children"]
+            if kids:
+                buf.append("<ul>")
+                stack.append("</ul></li>")
+                stack.extend(reversed(kids))
+            else:
+                buf.append("</li>")
 
     def render_neutralises(neutralises):
         if not neutralises:
             return "(none)"
-        if isinstance(neutralises, list):
-            return ", ".join(f"<a href='#bug-{nid}'>{nid}</a>" for nid in neutralises)
-        return f"<a href='#bug-{neutralises}'>{neutralises}</a>"
+        return ", ".join(link("bug", nid) for nid in neutralises)
 
-    def render_bug_report(all_versions):
+    def render_bug_report(sorted_items, buf):
         """Render flat list of all active bugs, with [new] for introduced bugs and fixed list."""
-        html = ""
-
         # Collect bugs by version, track which are new and which are fixed
-        bugs_by_version = {}
-        all_introduced_ids = set()
-        all_fixed_ids = set()
-        all_active_ids = set()
-
-        for version_id in all_versions.keys():
-            node = all_versions[version_id]
-            if node.get("active_bugs"):
-                bugs_by_version[version_id] = node["active_bugs"]
-                for b in node["active_bugs"]:
-                    all_active_ids.add(b["id"])
-            # Collect introduced and fixed bugs
-            if node.get("since_predecessor"):
-                for b in node["since_predecessor"].get("introduced", []):
-                    all_introduced_ids.add(b["id"])
-                for f in node["since_predecessor"].get("fixes", []):
-                    neuts = f.get("neutralises") or []
-                    if not isinstance(neuts, list):
-                        neuts = [neuts]
-                    for n in neuts:
-                        if n:
-                            all_fixed_ids.add(n)
+        # (sorted_items is in version order, so bugs_by_version is too)
+        bugs_by_version = {vid: node["active_bugs"] for vid, node in sorted_items if node.get("active_bugs")}
+        all_active_ids = {b["id"] for bugs in bugs_by_version.values() for b in bugs}
+        changes = [node["since_predecessor"] for _, node in sorted_items if node.get("since_predecessor")]
+        all_introduced_ids = {b["id"] for sp in changes for b in sp.get("introduced", [])}
+        all_fixed_ids = {n for sp in changes for f in sp.get("fixes", []) for n in f["neutralises"] if n}
 
         # Render active bugs grouped by element (with linked element ids)
         if bugs_by_version:
-            for version_id in sorted(bugs_by_version.keys()):
-                bugs = bugs_by_version[version_id]
-                display = get_element_display_name(conn, version_id)
-                display = display.replace(f"(Id: {version_id})", f"(Id: <a href='#{version_id}'>{version_id}</a>)")
-                html += f"<li>{display}<ul>"
+            for version_id, bugs in bugs_by_version.items():
+                display = linked_display_cache[version_id]
+                buf.append(f"<li>{display}<ul>")
                 for bug in bugs:
                     is_new = " [new]" if bug["id"] in all_introduced_ids else ""
                     # Sub-entry format: <ID> | <title>
-                    html += f"<li><a href='#bug-{bug['id']}'>{bug['id']}</a> | {bug['title']}{is_new}</li>"
-                html += "</ul></li>"
+                    buf.append(f"<li>{link('bug', bug['id'])} | {esc(bug['title'])}{is_new}</li>")
+                buf.append("</ul></li>")
         else:
-            html = "<li>(no active bugs)</li>"
+            buf.append("<li>(no active bugs)</li>")
 
         # Render fixed bugs list if any (linked)
         if all_fixed_ids:
-            html += "<li>Fixed since predecessor<ul>"
+            buf.append("<li>Fixed since predecessor<ul>")
             for bug_id in sorted(all_fixed_ids):
-                html += f"<li><a href='#bug-{bug_id}'>{bug_id}</a></li>"
-            html += "</ul></li>"
+                buf.append(f"<li>{link('bug', bug_id)}</li>")
+            buf.append("</ul></li>")
 
         # Add aggregated totals (deduped)
         total_active = len(all_active_ids)
         total_fixed = len(all_fixed_ids)
-        html += f"<li>Total aggregated active bugs: {total_active}</li>"
-        html += f"<li>Total aggregated fixed bugs: {total_fixed}</li>"
-
-        return html
+        buf.append(f"<li>Total aggregated active bugs: {total_active}</li>")
+        buf.append(f"<li>Total aggregated fixed bugs: {total_fixed}</li>")
 
-    def render_detailed_element_version(node):
+    def render_detailed_element_version(node, buf):
         """Render header and predecessor line for a single element version."""
         version_id = node["version"]
-        display = get_element_display_name(conn, version_id)
-        html = f"<li id='{version_id}'>{display}"
+        display = display_cache[version_id]
+        buf.append(f"<li id='{esc(version_id)}'>{display}")
 
         # Predecessor line (no hyperlink for predecessor ids)
         if "version_not_updated" in node and node.get("version_not_updated"):
-            html += "<div style='margin-left:8px'>Hint: Version was not updated.</div>"
+            buf.append("<div style='margin-left:8px'>Hint: Version was not updated.</div>")
         elif "predecessor_version" in node:
             if node["predecessor_version"]:
-                pred_display = get_element_display_name(conn, node["predecessor_version"])
-                html += f"<div style='margin-left:8px'>Updated from predecessor: {pred_display}</div>"
+                pred_display = display_cache[node["predecessor_version"]]
+                buf.append(f"<div style='margin-left:8px'>Updated from predecessor: {pred_display}</div>")
             else:
-                html += "<div style='margin-left:8px'>Updated from predecessor: (none)</div>"
-
-        return html
+                buf.append("<div style='margin-left:8px'>Updated from predecessor: (none)</div>")
 
     # Collect all versions
     collect_all_versions(data)
-
-    # Render sections
-    bom_html = render_bom(data)
-    bug_report_html = render_bug_report(all_versions)
+    sorted_items = sorted(all_versions.items())  # version ids are unique, nodes never compared
+
+    # Load every display name the report needs in one go
+    display_ids = set(all_versions)
+    display_ids.update(n["predecessor_version"] for n in all_versions.values() if n.get("predecessor_version"))
+    display_cache = {vid: esc(name) for vid, name in get_element_display_names(conn, display_ids).items()}
+    # Same names with the element id hyperlinked to its detailed entry
+    linked_display_cache = {
+        vid: name.replace(f"(Id: {esc(vid)})", f"(Id: <a href='#{esc(vid)}'>{esc(vid)}</a>)")
+        for vid, name in display_cache.items()
+    }
+
+    # Render sections into a single buffer, written out in one pass
+    buf = [f"""
+    <html>
+    <head><title>{esc(title)}</title></head>
+    <body>
+    <h1>{esc(title)}</h1>
+    
+    <h2>1. Bill of Materials (BOM)</h2>
+    <ul>"""]
+    render_bom(data, buf)
+    buf.append("""</ul>
+    
+    <h2>2. Bug Report</h2>
+    <ul>""")
+    render_bug_report(sorted_items, buf)
+    buf.append("""</ul>
     
-    detailed_html = "<ul>"
-    for version_id in sorted(all_versions.keys()):
-        node = all_versions[version_id]
-        html_entry = render_detailed_element_version(node)
+    <h2>3. Detailed Element Version Report</h2>
+    """)
+
+    buf.append("<ul>")
+    for version_id, node in sorted_items:
+        render_detailed_element_version(node, buf)
 
         # blank line separation
-        html_entry += "<div style='margin-top:6px'></div>"
+        buf.append("<div style='margin-top:6px'></div>")
 
         # Collect bugs: direct bugs in this element vs inherited from children
-        direct_bugs = {}
-        for bug in node.get("active_bugs", []):
-            if bug["id"] not in direct_bugs:
-                direct_bugs[bug["id"]] = bug
-
-        inherited_bugs = {}
-        for child in node.get("children", []):
-            child_bugs = collect_aggregated_bugs(child)
-            for bug_id, bug_info in child_bugs.items():
-                if bug_id not in inherited_bugs and bug_id not in direct_bugs:
-                    inherited_bugs[bug_id] = bug_info
+        direct_bugs = direct_bug_ids[version_id]
+        inherited_bugs = set().union(*(agg_cache[child["version"]] for child in node.get("children", []))) - direct_bugs
 
         total_bugs = len(direct_bugs) + len(inherited_bugs)
 
         # Active bugs in current element
-        html_entry += "<div style='margin-left:8px'>"
+        buf.append("<div style='margin-left:8px'>")
         if direct_bugs:
-            html_entry += "<div>Active bugs in current element:<ul>"
-            for bug in sorted(direct_bugs.values(), key=lambda b: b.get("id", "")):
-                html_entry += f"<li><a href='#bug-{bug['id']}'>{bug['id']}</a> | {bug['title']}</li>"
-            html_entry += "</ul></div>"
+            buf.append("<div>Active bugs in current element:<ul>")
+            for bug in map(bug_by_id.__getitem__, sorted(direct_bugs)):
+                buf.append(f"<li>{link('bug', bug['id'])} | {esc(bug['title'])}</li>")
+            buf.append("</ul></div>")
         else:
-            html_entry += "<div>Active bugs in current element: (none)</div>"
+            buf.append("<div>Active bugs in current element: (none)</div>")
 
         # Active bugs in child elements (only if node has children)
         if node.get("children"):
             if inherited_bugs:
-                html_entry += "<div>Active bugs in child elements:<ul>"
-                for bug in sorted(inherited_bugs.values(), key=lambda b: b.get("id", "")):
+                buf.append("<div>Active bugs in child elements:<ul>")
+                for bug in map(bug_by_id.__getitem__, sorted(inherited_bugs)):
                     path = find_bug_path(node, bug["id"])
                     if path and len(path) > 1:
-                        path_display_parts = []
-                        for vid in path[1:]:
-                            elem_display = get_element_display_name(conn, vid)
-                            elem_display = elem_display.replace(f"(Id: {vid})", f"(Id: <a href='#{vid}'>{vid}</a>)")
-                            path_display_parts.append(elem_display)
-                        path_display = " -> ".join(path_display_parts)
-                        html_entry += f"<li><a href='#bug-{bug['id']}'>{bug['id']}</a> | {path_display} | {bug['title']}</li>"
+                        path_display = " -> ".join(linked_display_cache[vid] for vid in path[1:])
+                        buf.append(f"<li>{link('bug', bug['id'])} | {path_display} | {esc(bug['title'])}</li>")
                     else:
-                        html_entry += f"<li><a href='#bug-{bug['id']}'>{bug['id']}</a> | {bug['title']}</li>"
-                html_entry += "</ul></div>"
+                        buf.append(f"<li>{link('bug', bug['id'])} | {esc(bug['title'])}</li>")
+                buf.append("</ul></div>")
             else:
-                html_entry += "<div>Active bugs in child elements: (none)</div>"
+                buf.append("<div>Active bugs in child elements: (none)</div>")
 
         # Total aggregated
-        html_entry += f"<div>Total aggregated: {total_bugs} active bug(s)</div>"
-        html_entry += "</div>"
+        buf.append(f"<div>Total aggregated: {total_bugs} active bug(s)</div>")
+        buf.append("</div>")
 
         # blank line
-        html_entry += "<div style='margin-top:6px'></div>"
+        buf.append("<div style='margin-top:6px'></div>")
 
         # Changes since predecessor (split into current element and child elements)
-        html_entry += "<div style='margin-left:8px'>"
+        buf.append("<div style='margin-left:8px'>")
 
         # Current element changes
-        html_entry += "<div>Changes since predecessor in current element:<div style='margin-left:8px'>"
+        buf.append("<div>Changes since predecessor in current element:<div style='margin-left:8px'>")
         ch_current = node.get("since_predecessor") or {}
         intro = ch_current.get("introduced")
         if intro:
-            html_entry += "<div>Bugs introduced:<ul>"
+            buf.append("<div>Bugs introduced:<ul>")
             for b in intro:
-                html_entry += f"<li><a href='#bug-{b['id']}'>{b['id']}</a> | {b.get('title','')}</li>"
-            html_entry += "</ul></div>"
+                buf.append(f"<li>{link('bug', b['id'])} | {esc(b.get('title'))}</li>")
+            buf.append("</ul></div>")
         else:
-            html_entry += "<div>Bugs introduced: (none)</div>"
+            buf.append("<div>Bugs introduced: (none)</div>")
 
         fixes = ch_current.get("fixes")
         if fixes:
-            html_entry += "<div>Bugs fixed:<ul>"
+            buf.append("<div>Bugs fixed:<ul>")
             for f in fixes:
-                neuts = f.get('neutralises') or []
-                if not isinstance(neuts, list):
-                    neuts = [neuts]
-                neutral_link = render_neutralises(neuts)
+                neutral_link = render_neutralises(f["neutralises"])
                 # Find source/version path for the fix (include current node for current-element section)
                 path = find_fix_path(node, f['id'])
                 if path:
                     # For current-element changes show the node itself (path[0])
-                    path_parts = []
-                    for vid in path:
-                        elem_display = get_element_display_name(conn, vid)
-                        elem_display = elem_display.replace(f"(Id: {vid})", f"(Id: <a href='#{vid}'>{vid}</a>)")
-                        path_parts.append(elem_display)
-                    path_display = " -> ".join(path_parts)
-                    html_entry += f"<li><a href='#fix-{f['id']}'>{f['id']}</a> (neutralises {neutral_link}) | {path_display} | {f.get('title','')}</li>"
+                    path_display = " -> ".join(linked_display_cache[vid] for vid in path)
+                    buf.append(f"<li>{link('fix', f['id'])} (neutralises {neutral_link}) | {path_display} | {esc(f.get('title'))}</li>")
                 else:
-                    html_entry += f"<li><a href='#fix-{f['id']}'>{f['id']}</a> (neutralises {neutral_link}) | {f.get('title','')}</li>"
-            html_entry += "</ul></div>"
+                    buf.append(f"<li>{link('fix', f['id'])} (neutralises {neutral_link}) | {esc(f.get('title'))}</li>")
+            buf.append("</ul></div>")
         else:
-            html_entry += "<div>Bugs fixed: (none)</div>"
+            buf.append("<div>Bugs fixed: (none)</div>")
 
-        html_entry += "</div></div>"
+        buf.append("</div></div>")
 
         # Changes in descendant (child) elements — only if node has children
         if node.get("children"):
-            child_changes = collect_changes_in_descendants(node)
-            html_entry += "<div style='margin-top:6px'></div>"
-            html_entry += "<div>Changes since predecessor in child elements:<div style='margin-left:8px'>"
-            c_intro = list(child_changes.get('introduced', {}).values())
+            child_introduced, child_fixes = changes_cache[node["version"]]
+            buf.append("<div style='margin-top:6px'></div>")
+            buf.append("<div>Changes since predecessor in child elements:<div style='margin-left:8px'>")
+            c_intro = list(child_introduced.values())
             if c_intro:
-                html_entry += "<div>Bugs introduced:<ul>"
+                buf.append("<div>Bugs introduced:<ul>")
                 for b in c_intro:
-                    html_entry += f"<li><a href='#bug-{b['id']}'>{b['id']}</a> | {b.get('title','')}</li>"
-                html_entry += "</ul></div>"
+                    buf.append(f"<li>{link('bug', b['id'])} | {esc(b.get('title'))}</li>")
+                buf.append("</ul></div>")
             else:
-                html_entry += "<div>Bugs introduced: (none)</div>"
+                buf.append("<div>Bugs introduced: (none)</div>")
 
-            c_fixes = list(child_changes.get('fixes', {}).values())
+            c_fixes = list(child_fixes.values())
             if c_fixes:
-                html_entry += "<div>Bugs fixed:<ul>"
+                buf.append("<div>Bugs fixed:<ul>")
                 for f in c_fixes:
-                    neuts = f.get('neutralises') or []
-                    if not isinstance(neuts, list):
-                        neuts = [neuts]
-                    neutral_link = render_neutralises(neuts)
+                    neutral_link = render_neutralises(f["neutralises"])
                     # For child elements, build path from current node to fix and skip current node in display
                     path = find_fix_path(node, f['id'])
                     if path and len(path) > 1:
-                        path_display_parts = []
-                        for vid in path[1:]:
-                            elem_display = get_element_display_name(conn, vid)
-                            elem_display = elem_display.replace(f"(Id: {vid})", f"(Id: <a href='#{vid}'>{vid}</a>)")
-                            path_display_parts.append(elem_display)
-                        path_display = " -> ".join(path_display_parts)
-                        html_entry += f"<li><a href='#fix-{f['id']}'>{f['id']}</a> (neutralises {neutral_link}) | {path_display} | {f.get('title','')}</li>"
+                        path_display = " -> ".join(linked_display_cache[vid] for vid in path[1:])
+                        buf.append(f"<li>{link('fix', f['id'])} (neutralises {neutral_link}) | {path_display} | {esc(f.get('title'))}</li>")
                     else:
-                        html_entry += f"<li><a href='#fix-{f['id']}'>{f['id']}</a> (neutralises {neutral_link}) | {f.get('title','')}</li>"
-                html_entry += "</ul></div>"
+                        buf.append(f"<li>{link('fix', f['id'])} (neutralises {neutral_link}) | {esc(f.get('title'))}</li>")
+                buf.append("</ul></div>")
             else:
-                html_entry += "<div>Bugs fixed: (none)</div>"
+                buf.append("<div>Bugs fixed: (none)</div>")
 
-            html_entry += "</div></div>"
+            buf.append("</div></div>")
 
-        html_entry += "</li>"  # Close the li tag
-        detailed_html += html_entry
-    detailed_html += "</ul>"
+        buf.append("</li>")  # Close the li tag
+    buf.append("</ul>")
     
+    cur = _tuple_cursor(conn)
+
     # Collect fixes mentioned in since_predecessor sections
     all_fixes = {}
     bug_to_fixes = defaultdict(list)
+    missing_bug_ids = set()  # neutralised bugs that are not active anywhere in the tree
     for node in all_versions.values():
         sp = node.get("since_predecessor")
         if sp and sp.get("fixes"):
             for f in sp.get("fixes", []):
                 all_fixes[f["id"]] = f
-                neuts = f.get("neutralises") or []
-                if not isinstance(neuts, list):
-                    neuts = [neuts]
-                for n in neuts:
+                for n in f["neutralises"]:
                     if n:
                         bug_to_fixes[n].append(f["id"])
-                        # ensure neutralised bug appears in all_bugs (even if not active)
                         if n not in all_bugs:
-                            row = conn.execute("SELECT id, title, description FROM tickets WHERE id = ?", (n,)).fetchone()
-                            if row:
-                                all_bugs[row["id"]] = {"title": row["title"], "description": row["description"], "versions": []}
+                            missing_bug_ids.add(n)
+    # ensure neutralised bugs appear in all_bugs (even if not active)
+    if missing_bug_ids:
+        _stage_ids(conn, "_ticket_ids", missing_bug_ids)
+        for tid, title, desc in cur.execute(_SQL_STAGED_TICKETS):
+            all_bugs[tid] = {"title": title, "description": desc, "versions": set()}
+    # a fix is recorded once per version it appears at; list each fix once
+    bug_to_fixes = {bug_id: sorted(set(fix_ids)) for bug_id, fix_ids in bug_to_fixes.items()}
 
     # Build ticket -> versions mapping for current containment DAG
+    # (filtered in SQL through a temp table)
+    _stage_ids(conn, "_report_versions", all_versions)
     ticket_to_versions = defaultdict(list)
-    for row in conn.execute("SELECT ticket_id, version_id FROM ticket_versions"):
-        if row["version_id"] in all_versions:
-            ticket_to_versions[row["ticket_id"]].append(row["version_id"])
+    for ticket_id, version_id in cur.execute(_SQL_TICKET_VERSIONS):
+        ticket_to_versions[ticket_id].append(version_id)
 
     # Render bug details section (include bugs that were neutralised by fixes)
-    bug_details_html = "<ul>"
+    buf.append("""
+    
+    <h2>4. Bug Details</h2>
+    """)
+    buf.append("<ul>")
     for bug_id in sorted(all_bugs.keys()):
         bug_info = all_bugs[bug_id]
-        bug_details_html += f"<li id='bug-{bug_id}'>{bug_id}<div>Title: {bug_info.get('title','')}</div><div>Description: {bug_info.get('description','')}</div>"
+        buf.append(f"<li id='bug-{esc(bug_id)}'>{esc(bug_id)}<div>Title: {esc(bug_info.get('title'))}</div><div>Description: {esc(bug_info.get('description'))}</div>")
         # Related element versions (within current containment DAG)
         related_versions = ticket_to_versions.get(bug_id, [])
         if related_versions:
-            parts = []
-            for vid in related_versions:
-                disp = get_element_display_name(conn, vid)
-                disp = disp.replace(f"(Id: {vid})", f"(Id: <a href='#{vid}'>{vid}</a>)")
-                parts.append(disp)
-            bug_details_html += f"<div>Related element versions: {', '.join(parts)}</div>"
+            related = ", ".join(linked_display_cache[vid] for vid in related_versions)
+            buf.append(f"<div>Related element versions: {related}</div>")
         if bug_to_fixes.get(bug_id):
-            fixes_links = ", ".join(f"<a href='#fix-{fid}'>{fid}</a>" for fid in sorted(bug_to_fixes[bug_id]))
-            bug_details_html += f"<div>Fixed by: {fixes_links}</div>"
-        bug_details_html += "</li>"
-    bug_details_html += "</ul>"
+            fixes_links = ", ".join(link("fix", fid) for fid in bug_to_fixes[bug_id])
+            buf.append(f"<div>Fixed by: {fixes_links}</div>")
+        buf.append("</li>")
+    buf.append("</ul>")
 
     # Render fix details section
-    fix_details_html = "<ul>"
+    buf.append("""
+
+    <h2>5. Fix Details</h2>
+    """)
+    buf.append("<ul>")
     for fix_id in sorted(all_fixes.keys()):
         fix = all_fixes[fix_id]
-        neuts = fix.get('neutralises') or []
-        if not isinstance(neuts, list):
-            neuts = [neuts]
-        neutralises_link = render_neutralises(neuts)
+        neutralises_link = render_neutralises(fix["neutralises"])
 
         # Related element versions for this fix (within current containment DAG)
         related_versions = ticket_to_versions.get(fix_id, [])
         related_html = ""
         if related_versions:
-            parts = []
-            for vid in related_versions:
-                disp = get_element_display_name(conn, vid)
-                disp = disp.replace(f"(Id: {vid})", f"(Id: <a href='#{vid}'>{vid}</a>)")
-                parts.append(disp)
-            related_html = f"<div>Related element versions: {', '.join(parts)}</div>"
-
-        fix_details_html += f"<li id='fix-{fix_id}'>{fix_id}<div>Title: {fix.get('title','')}</div><div>Description: {fix.get('description','')}</div><div>Neutralises: {neutralises_link}</div>{related_html}</li>"
-    fix_details_html += "</ul>"
+            related = ", ".join(linked_display_cache[vid] for vid in related_versions)
+            related_html = f"<div>Related element versions: {related}</div>"
 
-    html = f"""
-    <html>
-    <head><title>{title}</title></head>
-    <body>
-    <h1>{title}</h1>
-    
-    <h2>1. Bill of Materials (BOM)</h2>
-    <ul>{bom_html}</ul>
-    
-    <h2>2. Bug Report</h2>
-    <ul>{bug_report_html}</ul>
-    
-    <h2>3. Detailed Element Version Report</h2>
-    {detailed_html}
-    
-    <h2>4. Bug Details</h2>
-    {bug_details_html}
+        buf.append(f"<li id='fix-{esc(fix_id)}'>{esc(fix_id)}<div>Title: {esc(fix.get('title'))}</div><div>Description: {esc(fix.get('description'))}</div><div>Neutralises: {neutralises_link}</div>{related_html}</li>")
+    buf.append("</ul>")
 
-    <h2>5. Fix Details</h2>
-    {fix_details_html}
+    buf.append("""
     
     </body>
     </html>
-    """
-    Path(filename).write_text(html)
-    conn.close()
+    """)
+    # write the parts as they are instead of joining a second full copy
+    with open(filename, "w", buffering=1 << 20) as f:
+        f.writelines(buf)
@@ -1,108 +1,151 @@
 
-from db import get_connection
+from db import connection, get_connection, initialize_database, transaction
 import logging
 
 logger = logging.getLogger(__name__)
 
-def create_sample_data():
-    conn = get_connection()
-    cur = conn.cursor()
-
-    elements = [
-        ("E_APP", "Application"),
-        ("E_LIB", "Library"),
-        ("E_UTIL", "Utility")
-    ]
-    cur.executemany("INSERT OR IGNORE INTO elements VALUES (?,?)", elements)
-
-    versions = [
-        ("APP_v1", "E_APP", "1", "A"),
-        ("APP_v2", "E_APP", "2", "A"),
-        ("APP_1_0_0_B", "E_APP", "1.0.0", "B"),
-        ("LIB_v1", "E_LIB", "1", "A"),
-        ("LIB_v2", "E_LIB", "2", "A"),
-        ("LIB_v3", "E_LIB", "3", "A"),
-        ("LIB_v2_B", "E_LIB", "2", "B"),
-        ("UTIL_v1", "E_UTIL", "1", "A")
-    ]
-    cur.executemany(
-        "INSERT OR IGNORE INTO element_versions(id, element_id, version, variant) VALUES (?,?,?,?)",
-        versions
-    )
-
-    history = [
-        ("APP_v2", "APP_v1"),
-        ("APP_1_0_0_B", "APP_v2"),
-        ("LIB_v2", "LIB_v1"),
-        ("LIB_v2_B", "LIB_v2"),
-        ("LIB_v3", "LIB_v2")
-    ]
-    cur.executemany(
-        "INSERT OR IGNORE INTO element_version_predecessors VALUES (?,?)",
-        history
-    )
-
-    deps = [
-        ("APP_v2", "LIB_v3"),
-        ("APP_v2", "UTIL_v1"),
-        ("LIB_v3", "UTIL_v1"),
-        ("APP_v1", "LIB_v1"),
-        ("APP_v1", "UTIL_v1")
-    ]
-    cur.executemany(
-        "INSERT OR IGNORE INTO element_version_dependencies VALUES (?,?)",
-        deps
-    )
+_SQL_TICKETS_ON_CONFLICT = """
+    ON CONFLICT(id) DO UPDATE SET
+        type=excluded.type,
+        title=excluded.title,
+        description=excluded.description
+    WHERE type IS NOT excluded.type
+       OR title IS NOT excluded.title
+       OR description IS NOT excluded.description
+"""
 
+# Seed rows, built once at import
+_ELEMENTS = (
+    ("E_APP", "Application"),
+    ("E_LIB", "Library"),
+    ("E_UTIL", "Utility")
+)
+
+_VERSIONS = (
+    ("APP_v1", "E_APP", "1", "A"),
+    ("APP_v2", "E_APP", "2", "A"),
+    ("APP_1_0_0_B", "E_APP", "1.0.0", "B"),
+    ("LIB_v1", "E_LIB", "1", "A"),
+    ("LIB_v2", "E_LIB", "2", "A"),
+    ("LIB_v3", "E_LIB", "3", "A"),
+    ("LIB_v2_B", "E_LIB", "2", "B"),
+    ("UTIL_v1", "E_UTIL", "1", "A")
+)
+
+_HISTORY = (
+    ("APP_v2", "APP_v1"),
+    ("APP_1_0_0_B", "APP_v2"),
+    ("LIB_v2", "LIB_v1"),
+    ("LIB_v2_B", "LIB_v2"),
+    ("LIB_v3", "LIB_v2")
+)
+
+_DEPS = (
+    ("APP_v2", "LIB_v3"),
+    ("APP_v2", "UTIL_v1"),
+    ("LIB_v3", "UTIL_v1"),
+    ("APP_v1", "LIB_v1"),
+    ("APP_v1", "UTIL_v1"),
     # Add dependencies for the new Application variant: inherit APP_v2 but replace library with LIB_v2_B
-    new_deps = [
-        ("APP_1_0_0_B", "LIB_v2_B"),
-        ("APP_1_0_0_B", "UTIL_v1")
-    ]
-    cur.executemany(
-        "INSERT OR IGNORE INTO element_version_dependencies VALUES (?,?)",
-        new_deps
-    )
-
-    tickets = [
-        ("BUG1", "bug", "Memory corruption", "After 5 minutes there is a memory leak."),
-        ("BUG2", "bug", "Utility crash", "When clicking Print button the application crashes."),
-        ("FIX1", "bugfix", "Fix memory corruption", "Added proper free() calls.")
-    ]
-    # Use an UPSERT so re-running the sample generator updates existing rows
-    cur.executemany(
-        """
-        INSERT INTO tickets(id,type,title,description)
-        VALUES (?,?,?,?)
-        ON CONFLICT(id) DO UPDATE SET
-            type=excluded.type,
-            title=excluded.title,
-            description=excluded.description;
-        """,
-        tickets
-    )
-
-    ticket_versions = [
-        ("BUG1", "LIB_v1"),
-        ("BUG2", "UTIL_v1"),
-        ("FIX1", "LIB_v3")
-    ]
-    cur.executemany(
-        "INSERT OR IGNORE INTO ticket_versions VALUES (?,?)",
-        ticket_versions
-    )
-
-    # No explicit fix ticket: BUG2 will be fixed implicitly by removing the dependency in the DAG
-
-    # Map fixes to the bugs they neutralise (support multiple neutralisations)
-    fix_neutralises = [
-        ("FIX1", "BUG1"),
-    ]
-    cur.executemany(
-        "INSERT OR IGNORE INTO fix_neutralises VALUES (?,?)",
-        fix_neutralises
-    )
-
-    conn.commit()
-    conn.close()
-    logger.info("Inserted sample elements=%d versions=%d tickets=%d", len(elements), len(versions), len(tickets))
+    ("APP_1_0_0_B", "LIB_v2_B"),
+    ("APP_1_0_0_B", "UTIL_v1")
+)
+
+_TICKETS = (
+    ("BUG1", "bug", "Memory corruption", "After 5 minutes there is a memory leak."),
+    ("BUG2", "bug", "Utility crash", "When clicking Print button the application crashes."),
+    ("FIX1", "bugfix", "Fix memory corruption", "Added proper free() calls.")
+)
+
+_TICKET_VERSIONS = (
+    ("BUG1", "LIB_v1"),
+    ("BUG2", "UTIL_v1"),
+    ("FIX1", "LIB_v3")
+)
+
+# No explicit fix ticket: BUG2 will be fixed implicitly by removing the dependency in the DAG
+
+# Map fixes to the bugs they neutralise (support multiple neutralisations)
+_FIX_NEUTRALISES = (
+    ("FIX1", "BUG1"),
+)
+
+_SQL_SEED_INDEXES = """
+    SELECT name, tbl_name, sql FROM sqlite_master
+    WHERE type = 'index' AND sql IS NOT NULL
+      AND tbl_name IN ('elements', 'element_versions', 'element_version_predecessors',
+                       'element_version_dependencies', 'tickets', 'ticket_versions',
+                       'fix_neutralises')
+"""
+
+def _insert_rows(conn, table, rows, columns=None, on_conflict=None):
+    """Insert rows with multi-row VALUES statements, one per chunk that stays
+    under SQLite's default limit of 999 bound parameters. Rows that collide
+    are ignored unless an on_conflict upsert clause is given."""
+    if not rows:
+        return
+    width = len(rows[0])
+    target = f"{table}({','.join(columns)})" if columns else table
+    verb = "INSERT INTO" if on_conflict else "INSERT OR IGNORE INTO"
+    placeholder = "(" + ",".join("?" * width) + ")"
+    per_chunk = 999 // width
+    for i in range(0, len(rows), per_chunk):
+        chunk = rows[i:i + per_chunk]
+        conn.execute(
+            f"{verb} {target} VALUES " + ",".join([placeholder] * len(chunk)) + (on_conflict or ""),
+            [v for row in chunk for v in row]
+        )
+
+def create_sample_data(conn=None, force=False):
+    """Insert the demo dataset, into conn if given (left open) or the default
+    database. An already seeded database is left untouched unless force is
+    set, which re-runs the inserts and refreshes the ticket text. Returns
+    whether any row was inserted or updated."""
+    with connection(conn) as conn:
+        if not force and conn.execute(
+                "SELECT 1 FROM elements WHERE id = ? LIMIT 1", (_ELEMENTS[0][0],)).fetchone():
+            return False
+        before = conn.total_changes
+        _create_sample_data(conn)
+        return conn.total_changes != before
+
+def create_memory_sample_data(path=None):
+    """Build the schema and demo dataset in a fresh in-memory database and
+    return its connection. With path, the result is also written there in
+    one pass by VACUUM INTO; the file must not exist yet."""
+    conn = get_connection(":memory:")
+    initialize_database(conn)
+    _create_sample_data(conn)
+    if path is not None:
+        conn.execute("VACUUM INTO ?", (str(path),))
+    return conn
+
+def _create_sample_data(conn):
+    # every insert below shares one transaction, committed once at the end
+    # unless the caller already has one open
+    with transaction(conn):
+        # on a fresh database, drop the secondary indexes of the seeded tables
+        # for the bulk insert and rebuild each with one sort afterwards; a
+        # populated table keeps its indexes, since a rebuild would cost more
+        # than the few seed rows. PK/UNIQUE autoindexes have no sql and stay put
+        indexes = [
+            (name, sql) for name, table, sql in conn.execute(_SQL_SEED_INDEXES)
+            if not conn.execute(f'SELECT 1 FROM "{table}" LIMIT 1').fetchone()
+        ]
+        for name, _ in indexes:
+            conn.execute(f'DROP INDEX "{name}"')
+
+        _insert_rows(conn, "elements", _ELEMENTS)
+        _insert_rows(conn, "element_versions", _VERSIONS, ("id", "element_id", "version", "variant"))
+        _insert_rows(conn, "element_version_predecessors", _HISTORY)
+        _insert_rows(conn, "element_version_dependencies", _DEPS)
+        # Use an UPSERT so re-running the sample generator updates existing rows
+        _insert_rows(conn, "tickets", _TICKETS, ("id", "type", "title", "description"),
+                      on_conflict=_SQL_TICKETS_ON_CONFLICT)
+        _insert_rows(conn, "ticket_versions", _TICKET_VERSIONS)
+        _insert_rows(conn, "fix_neutralises", _FIX_NEUTRALISES)
+
+        for _, sql in indexes:
+            conn.execute(sql)
+
+    logger.info("Inserted sample elements=%d versions=%d tickets=%d", len(_ELEMENTS), len(_VERSIONS), len(_TICKETS))
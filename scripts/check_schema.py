@@ -1,5 +1,11 @@
-import sqlite3, json
-c = sqlite3.connect('graph_system.db')
-rows = [list(r) for r in c.execute("PRAGMA table_info(tickets)")]
-print(json.dumps(rows, indent=2))
+import sqlite3, json, sys
+c = sqlite3.connect('file:graph_system.db?mode=ro', uri=True)
+# write each row as it is read; output matches json.dumps(rows, indent=2)
+out = sys.stdout.write
+sep = "[\n  "
+for r in c.execute("PRAGMA table_info(tickets)"):
+    out(sep)
+    out(json.dumps(list(r), indent=2).replace("\n", "\n  "))
+    sep = ",\n  "
+out("[]\n" if sep == "[\n  " else "\n]\n")
 c.close()